@@ -1,5 +1,7 @@
 #!/usr/bin/python3
+import os
 import socket
+import selectors
 import sys
 
 
@@ -43,6 +45,14 @@ def connect_to_server(hostname, port):
     """
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Disable Nagle and enlarge kernel buffers for the
+        # latency-sensitive command/response loop (best-effort)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        except OSError:
+            pass
         sock.connect((hostname, port))
         return sock
     except Exception as e:
@@ -50,7 +60,46 @@ def connect_to_server(hostname, port):
         return None
 
 
-def handle_login(sock, sock_file):
+def _pop_line(buf):
+    """
+    Remove and return one complete line from a bytearray buffer,
+    or None if no full line has arrived yet.
+    """
+    i = buf.find(b"\n")
+    if i < 0:
+        return None
+    line = bytes(buf[:i]).rstrip(b"\r").decode("utf-8", errors="replace")
+    del buf[:i + 1]
+    return line
+
+
+def _read_stdin_line(stdin_buf, prompt=""):
+    """
+    Read one line from stdin through the raw fd, refilling stdin_buf.
+    Reading the fd directly (instead of input()) keeps unread lines
+    visible to the selector in command_loop.
+    Returns the line without its newline, or None on EOF.
+    """
+    if prompt:
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+    fd = sys.stdin.fileno()
+    while True:
+        line = _pop_line(stdin_buf)
+        if line is not None:
+            return line
+        data = os.read(fd, 65536)
+        if not data:
+            if stdin_buf:
+                # Unterminated final line before EOF
+                line = bytes(stdin_buf).decode("utf-8", errors="replace")
+                stdin_buf.clear()
+                return line
+            return None
+        stdin_buf.extend(data)
+
+
+def handle_login(sock, sock_file, stdin_buf):
     """
     Perform the login phase.
     - Receive welcome line
@@ -66,13 +115,15 @@ def handle_login(sock, sock_file):
     print(welcome)
 
     while True:
-        username = input("User: ")
-        password = input("Password: ")
+        username = _read_stdin_line(stdin_buf, "User: ")
+        password = _read_stdin_line(stdin_buf, "Password: ")
+        if username is None or password is None:
+            print("Client input stream closed (EOF). Closing connection.")
+            return False
 
-        # Send in protocol format
+        # Send both protocol lines in one write: one syscall, one segment
         try:
-            sock.sendall(f"User: {username}\n".encode())
-            sock.sendall(f"Password: {password}\n".encode())
+            sock.sendall(f"User: {username}\nPassword: {password}\n".encode())
         except Exception as e:
             print(f"Error sending login data: {e}")
             return False
@@ -93,94 +144,197 @@ def handle_login(sock, sock_file):
             return False
 
 
-def is_valid_command(cmd):
+def _parse_parentheses(arg):
+    # Expect one space and something after it (the X string)
+    if arg.startswith(" ") and arg[1:] != "":
+        return ("parentheses", arg[1:])
+    return None
+
+
+def _parse_lcm(arg):
+    # Expect: X Y   where X and Y are ints
+    parts = arg.split()
+    if len(parts) != 2:
+        return None
+    try:
+        return ("lcm", int(parts[0]), int(parts[1]))
+    except ValueError:
+        return None
+
+
+def _parse_caesar(arg):
+    # Expect: plaintext X
+    # plaintext may contain spaces, X is the last token and must be int
+    after_prefix = arg.strip()
+    # Need at least "something X"
+    if " " not in after_prefix:
+        return None
+    plaintext, shift_str = after_prefix.rsplit(" ", 1)
+    if not plaintext:
+        return None
+    try:
+        return ("caesar", plaintext, int(shift_str))
+    except ValueError:
+        return None
+
+
+# Command name -> parser for the part after the ':'
+_PARSERS = {
+    "parentheses": _parse_parentheses,
+    "lcm": _parse_lcm,
+    "caesar": _parse_caesar,
+}
+
+# Command name -> protocol line template, filled from the parsed tuple
+_WIRE_FORMATS = {
+    "quit": "quit\n",
+    "parentheses": "parentheses: {0}\n",
+    "lcm": "lcm: {0} {1}\n",
+    "caesar": "caesar: {0} {1}\n",
+}
+
+
+def parse_command(cmd):
     """
-    Validate the basic format of a command according to the assignment.
-    Returns True if the format is valid, False otherwise.
+    Parse and validate a command according to the assignment.
+    Returns a tuple (name, *args) if the format is valid, None otherwise.
     """
     line = cmd.strip()
 
     if line == "quit":
-        return True
+        return ("quit",)
 
-    if line.startswith("parentheses:"):
-        # Expect at least one space and something after it (the X string)
-        parts = line.split(" ", 1)
-        return len(parts) == 2 and parts[1] != ""
+    head, sep, rest = line.partition(":")
+    parser = _PARSERS.get(head) if sep else None
+    # Any command not in the table is invalid
+    return parser(rest) if parser is not None else None
 
-    if line.startswith("lcm:"):
-        # Expect: lcm: X Y   where X and Y are ints
-        parts = line.split()
-        # parts should be: ["lcm:", "X", "Y"]
-        if len(parts) != 3:
-            return False
-        try:
-            int(parts[1])
-            int(parts[2])
-            return True
-        except ValueError:
-            return False
 
-    if line.startswith("caesar:"):
-        # Expect: caesar: plaintext X
-        # plaintext may contain spaces, X is the last token and must be int
-        after_prefix = line[len("caesar:"):].strip()
-        # Need at least "something X"
-        if " " not in after_prefix:
-            return False
-        plaintext, shift_str = after_prefix.rsplit(" ", 1)
-        if not plaintext:
-            return False
+def _make_stdin_selector(sock):
+    """
+    Build a selector watching both stdin and the socket.
+    epoll cannot watch regular files (e.g. redirected stdin),
+    so fall back to plain select in that case.
+    """
+    for selector_cls in (selectors.DefaultSelector, selectors.SelectSelector):
+        sel = selector_cls()
         try:
-            int(shift_str)
-            return True
-        except ValueError:
-            return False
-
-    # Any other command is invalid
-    return False
+            sel.register(sys.stdin.fileno(), selectors.EVENT_READ, "stdin")
+        except PermissionError:
+            sel.close()
+            continue
+        sel.register(sock, selectors.EVENT_READ, "sock")
+        return sel
+    raise OSError("cannot watch stdin with any selector")
 
 
-def command_loop(sock, sock_file):
+def command_loop(sock, stdin_buf):
     """
     After successful login, handle the commands loop:
-    - Read user input
-    - Validate format
-    - If invalid: print error and disconnect
-    - If valid: send to server, print server response
-    - Stop on 'quit' or disconnect
+    - Watch stdin and the socket together, reacting to whichever is
+      ready, so a slow server never blocks typing and vice versa
+    - Validate user commands; if invalid: print error and disconnect
+    - If valid: send to server; print server responses as they arrive
+    - Stop on 'quit', EOF, or disconnect
     """
-    while True:
-        try:
-            user_input = input()
-        except EOFError:
-            print("Client input stream closed (EOF). Closing connection.")
-            sock.sendall("quit\n".encode())
-            break
-
-        if not is_valid_command(user_input):
-            print("Error: invalid command format. Closing connection.")
-            break
-
-        if user_input.strip() == "quit":
+    sel = _make_stdin_selector(sock)
+    stdin_fd = sys.stdin.fileno()
+    sock_buf = bytearray()
+    awaiting = 0  # responses the server still owes us
+
+    def print_responses():
+        nonlocal awaiting
+        while True:
+            response = _pop_line(sock_buf)
+            if response is None:
+                return
+            print(response)
+            if awaiting > 0:
+                awaiting -= 1
+
+    def drain_responses():
+        # Commands are pipelined; collect what the server still owes
+        # before closing so no response is silently dropped.
+        while awaiting > 0:
             try:
-                sock.sendall((user_input + "\n").encode())
-            except Exception as e:
-                print(f"Error sending data: {e}. Closing connection.")
-            break
+                data = sock.recv(65536)
+            except Exception:
+                return
+            if not data:
+                return
+            sock_buf.extend(data)
+            print_responses()
+
+    def handle_user_line(line):
+        """
+        Parse, validate, and send one user command.
+        Returns False when the command loop should stop.
+        """
+        nonlocal awaiting
+        parsed = parse_command(line)
+        if parsed is None:
+            drain_responses()
+            print("Error: invalid command format. Closing connection.")
+            return False
 
+        # Build the wire line once from the already-parsed fields
+        wire = _WIRE_FORMATS[parsed[0]].format(*parsed[1:])
         try:
-            sock.sendall((user_input + "\n").encode())
+            sock.sendall(wire.encode())
         except Exception as e:
             print(f"Error sending data: {e}. Closing connection.")
-            break
+            return False
 
-        # For 'quit', we still expect the server to possibly respond, but if it just closes, recv_line will return ''.
-        response = sock_file.readline().strip()
-        if not response:
-            print("Server closed the connection.")
-            break
-        print(response)
+        if parsed[0] == "quit":
+            drain_responses()
+            return False
+        awaiting += 1
+        return True
+
+    with sel:
+        # Lines read past the login phase may already be buffered
+        while True:
+            line = _pop_line(stdin_buf)
+            if line is None:
+                break
+            if not handle_user_line(line):
+                return
+
+        while True:
+            for key, _ in sel.select():
+                if key.data == "stdin":
+                    data = os.read(stdin_fd, 65536)
+                    if not data:
+                        # EOF: run any unterminated final line, then quit
+                        if stdin_buf:
+                            stdin_buf.extend(b"\n")
+                            line = _pop_line(stdin_buf)
+                            if not handle_user_line(line):
+                                return
+                        print("Client input stream closed (EOF). Closing connection.")
+                        drain_responses()
+                        try:
+                            sock.sendall(b"quit\n")
+                        except Exception:
+                            pass
+                        return
+                    stdin_buf.extend(data)
+                    while True:
+                        line = _pop_line(stdin_buf)
+                        if line is None:
+                            break
+                        if not handle_user_line(line):
+                            return
+                else:
+                    try:
+                        data = sock.recv(65536)
+                    except Exception:
+                        data = b""
+                    if not data:
+                        print("Server closed the connection.")
+                        return
+                    sock_buf.extend(data)
+                    print_responses()
 
 
 def main():
@@ -191,7 +345,7 @@ def main():
         return
 
     try:
-        sock_file = sock.makefile('r', encoding='utf-8')
+        sock_file = sock.makefile('r', encoding='utf-8', buffering=65536, newline='\n')
     except Exception as e:
         print(f"Error creating file stream: {e}", file=sys.stderr)
         sock.close()
@@ -200,12 +354,13 @@ def main():
     # Use 'with' so socket is closed automatically
     with sock, sock_file:
         try:
-            logged_in = handle_login(sock, sock_file)
+            stdin_buf = bytearray()
+            logged_in = handle_login(sock, sock_file, stdin_buf)
             if not logged_in:
                 print("Error: login failed, Closing connection.")
                 return
 
-            command_loop(sock, sock_file)
+            command_loop(sock, stdin_buf)
 
         except Exception as e:
             print(f"Client error: {e}")
@@ -0,0 +1,57 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional compiled fast paths for ex1_server's hot pure functions.
+Build in place with:  python setup_fast.py build_ext --inplace
+ex1_server.py falls back to its pure-Python versions when this
+module is not built.
+"""
+
+
+def is_parentheses_balanced(str s):
+    """
+    Check if a parentheses string is balanced.
+    Ignores non-parentheses characters.
+    """
+    cdef Py_ssize_t depth = 0
+    cdef Py_UCS4 ch
+    for ch in s:
+        if ch == u'(':
+            depth += 1
+        elif ch == u')':
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def caesar_cipher(str plaintext, object shift):
+    """
+    Caesar cipher: shift letters by 'shift', output lowercase letters.
+    Spaces are preserved.
+    If any character is not [A-Za-z ] -> return None (invalid input).
+    """
+    cdef bytes raw
+    try:
+        raw = plaintext.encode('ascii')
+    except UnicodeEncodeError:
+        return None
+
+    cdef Py_ssize_t i, n = len(raw)
+    cdef bytearray out = bytearray(n)
+    # Reduce with Python arithmetic first: shift is an arbitrary-precision
+    # int and converting it to a C long before the % 26 would overflow
+    cdef long k = shift % 26
+    cdef unsigned char c
+    cdef const unsigned char* src = raw
+    for i in range(n):
+        c = src[i]
+        if c == 32:  # space
+            out[i] = 32
+        elif 97 <= c <= 122:  # a-z
+            out[i] = <unsigned char> (97 + (c - 97 + k) % 26)
+        elif 65 <= c <= 90:  # A-Z
+            out[i] = <unsigned char> (97 + (c - 65 + k) % 26)
+        else:
+            # invalid character
+            return None
+    return bytes(out).decode('ascii')
@@ -1,12 +1,26 @@
 #!/usr/bin/python3
 import socket
 import sys
-import select
+import selectors
 import math
+from functools import lru_cache
 
 DEFAULT_PORT = 1337
 BACKLOG = 5
 RECV_BUF_SIZE = 4096
+SOCK_BUF_SIZE = 1 << 20
+
+# Pre-encoded protocol messages; parameterized responses are built
+# from a constant prefix/suffix plus the encoded variable part
+WELCOME_MSG = b"Welcome! Please log in\n"
+FAILED_LOGIN = b"Failed to login.\n"
+HI_PREFIX = b"Hi "
+HI_SUFFIX = b", good to see you\n"
+PAREN_YES = b"the parentheses are balanced: yes\n"
+PAREN_NO = b"the parentheses are balanced: no\n"
+LCM_PREFIX = b"the lcm is: "
+CAESAR_PREFIX = b"the ciphertext is: "
+CAESAR_ERR = b"error: invalid input\n"
 
 
 def parse_args():
@@ -62,25 +76,49 @@ def is_parentheses_balanced(s):
     Check if a parentheses string is balanced.
     Ignores non-parentheses characters.
     """
-    stack = []
+    # Cheap C-level precheck: totals must match before scanning prefixes
+    if s.count("(") != s.count(")"):
+        return False
+    depth = 0
     for ch in s:
         if ch == "(":
-            stack.append(ch)
+            depth += 1
         elif ch == ")":
-            if not stack:
+            depth -= 1
+            if depth < 0:
                 return False
-            stack.pop()
-    return len(stack) == 0
+    return True
 
 
-def lcm(a, b):
-    """
-    Compute the least common multiple of two integers.
-    For 0, we define lcm(0, x) = 0.
-    """
-    if a == 0 or b == 0:
-        return 0
-    return abs(a * b) // math.gcd(a, b)
+try:
+    # Python 3.9+: implemented in C and avoids the a*b intermediate
+    from math import lcm
+except ImportError:
+    def lcm(a, b):
+        """
+        Compute the least common multiple of two integers.
+        For 0, we define lcm(0, x) = 0.
+        """
+        if a == 0 or b == 0:
+            return 0
+        return abs(a * b) // math.gcd(a, b)
+
+
+_VALID_CAESAR_BYTES = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ "
+
+# shift % 26 -> 256-entry bytes.translate table: [A-Za-z] to shifted lowercase
+_caesar_tables = {}
+
+
+def _caesar_table(shift):
+    shift %= 26
+    table = _caesar_tables.get(shift)
+    if table is None:
+        lower = b"abcdefghijklmnopqrstuvwxyz"
+        shifted = lower[shift:] + lower[:shift]
+        table = bytes.maketrans(lower + lower.upper(), shifted + shifted)
+        _caesar_tables[shift] = table
+    return table
 
 
 def caesar_cipher(plaintext, shift):
@@ -89,18 +127,80 @@ def caesar_cipher(plaintext, shift):
     Spaces are preserved.
     If any character is not [A-Za-z ] -> return None (invalid input).
     """
-    result = []
-    base = ord("a")
-    for ch in plaintext:
-        if ch == " ":
-            result.append(" ")
-        elif ch.isalpha():
-            offset = (ord(ch.lower()) - base + shift) % 26
-            result.append(chr(base + offset))
-        else:
-            # invalid character
-            return None
-    return "".join(result)
+    try:
+        raw = plaintext.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    # Deleting every valid byte must leave nothing, else input is invalid
+    if raw.translate(None, _VALID_CAESAR_BYTES):
+        return None
+    return raw.translate(_caesar_table(shift)).decode("ascii")
+
+
+try:
+    # Optional compiled fast paths (see ex1_fast.pyx); the pure-Python
+    # definitions above remain the fallback when the extension
+    # has not been built
+    from ex1_fast import is_parentheses_balanced, caesar_cipher
+except ImportError:
+    pass
+
+
+# The computations below are pure, so repeat queries can reuse the
+# already-encoded response line; caches are size-bounded so adversarial
+# input cannot grow them without limit.
+
+@lru_cache(maxsize=4096)
+def _paren_resp(s):
+    """Encoded response line for a parentheses command."""
+    return PAREN_YES if is_parentheses_balanced(s) else PAREN_NO
+
+
+@lru_cache(maxsize=4096)
+def _lcm_resp(x, y):
+    """Encoded response line for an lcm command."""
+    return LCM_PREFIX + str(lcm(x, y)).encode() + b"\n"
+
+
+@lru_cache(maxsize=4096)
+def _caesar_resp(plaintext, shift):
+    """Encoded response line for a caesar command."""
+    ciphertext = caesar_cipher(plaintext, shift)
+    if ciphertext is None:
+        return CAESAR_ERR
+    return CAESAR_PREFIX + ciphertext.encode() + b"\n"
+
+
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+
+def send_parts(sock, parts):
+    """
+    Write a list of bytes pieces with one scatter-gather syscall where
+    available, completing any short write with sendall.
+    """
+    if _HAS_SENDMSG:
+        sent = sock.sendmsg(parts)
+        total = sum(len(p) for p in parts)
+        if sent < total:
+            sock.sendall(b"".join(parts)[sent:])
+    else:
+        sock.sendall(b"".join(parts))
+
+
+def tune_socket(sock):
+    """
+    Latency/throughput tuning: disable Nagle's algorithm so short
+    request/response lines are not delayed, and enlarge the kernel
+    socket buffers.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+    except OSError:
+        # Tuning is best-effort; defaults still work
+        pass
 
 
 def create_listening_socket(port):
@@ -109,6 +209,7 @@ def create_listening_socket(port):
     """
     srv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    tune_socket(srv_sock)
     try:
         srv_sock.bind(("", port))
     except Exception:
@@ -116,6 +217,8 @@ def create_listening_socket(port):
         srv_sock.close()
         sys.exit(1)
     srv_sock.listen(BACKLOG)
+    # Non-blocking so one readiness event can drain every pending accept
+    srv_sock.setblocking(False)
     return srv_sock
 
 
@@ -127,16 +230,32 @@ def main():
     _, port = server_sock.getsockname() # Get the actual port number
     print(f"Server listening on port {port}")
 
-    # Sockets to monitor
-    inputs = [server_sock]
+    # Selector delivers only the ready sockets (epoll on Linux)
+    sel = selectors.DefaultSelector()
+    sel.register(server_sock, selectors.EVENT_READ)
+
+    # One reusable receive buffer shared by all clients; recv_into fills
+    # it in place so the recv path allocates nothing per call
+    recv_buf = bytearray(RECV_BUF_SIZE)
+    recv_view = memoryview(recv_buf)
 
     # Per-client state
-    buffers = {}       # sock -> str (accumulated incoming data)
+    buffers = {}       # sock -> bytearray (accumulated incoming data)
+    pending = {}       # sock -> list of bytes pieces awaiting one gathered write
     client_state = {}  # sock -> dict: {logged_in, login_stage, username, pending_username}
 
     def close_client(sock):
-        if sock in inputs:
-            inputs.remove(sock)
+        try:
+            sel.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        # Deliver any responses queued before the close was decided
+        out = pending.pop(sock, None)
+        if out:
+            try:
+                send_parts(sock, out)
+            except Exception:
+                pass
         buffers.pop(sock, None)
         client_state.pop(sock, None)
         try:
@@ -144,177 +263,172 @@ def main():
         except Exception:
             pass
 
+    def flush(sock):
+        """
+        Send all queued output for this client in a single gathered write.
+        """
+        out = pending.get(sock)
+        if not out:
+            return
+        try:
+            send_parts(sock, out)
+            out.clear()
+        except Exception:
+            close_client(sock)
+
     def handle_login_line(sock, line, state):
         """
         Handle a single line during the login phase.
         state: dict for this client.
         """
         if state["login_stage"] == "await_user":
-            if not line.startswith("User: "):
+            head, sep, username = line.partition(": ")
+            if not sep or head != "User":
                 # client sent something else before User: -> close
                 close_client(sock)
                 return
-            username = line[len("User: "):]
             state["pending_username"] = username
             state["login_stage"] = "await_password"
 
         elif state["login_stage"] == "await_password":
-            if not line.startswith("Password: "):
+            head, sep, password = line.partition(": ")
+            if not sep or head != "Password":
                 close_client(sock)
                 return
-            password = line[len("Password: "):]
             username = state["pending_username"]
 
-            # Check credentials
-            if username in users.keys() and users[username] == password:
+            # Check credentials with a single dict lookup
+            expected = users.get(username)
+            if expected is not None and expected == password:
                 state["logged_in"] = True
                 state["username"] = username
                 state["login_stage"] = None
                 state["pending_username"] = None
-                try:
-                    sock.sendall(f"Hi {username}, good to see you\n".encode())
-                except Exception:
-                    close_client(sock)
+                pending[sock].extend((HI_PREFIX, username.encode(), HI_SUFFIX))
             else:
                 # Failed login, allow retry
                 state["pending_username"] = None
                 state["login_stage"] = "await_user"
-                try:
-                    sock.sendall("Failed to login.\n".encode())
-                except Exception:
-                    close_client(sock)
+                pending[sock].append(FAILED_LOGIN)
 
-    def handle_command_line(sock, line, state):
-        """
-        Handle a single command line for a logged-in client.
-        """
-        stripped = line.strip()
+    def handle_parentheses(sock, arg):
+        # arg is everything after "parentheses:"; protocol mandates one space
+        if not arg.startswith(" "):
+            close_client(sock)
+            return
+        pending[sock].append(_paren_resp(arg[1:]))
 
-        # quit: close connection, no response required
-        if stripped == "quit":
+    def handle_lcm(sock, arg):
+        parts = arg.split()
+        if len(parts) != 2:
             close_client(sock)
             return
-        # parentheses: X
-        if line.startswith("parentheses:"):
-            parts = line.split(" ", 1)
-            if len(parts) != 2:
-                close_client(sock)
-                return
-            paren_str = parts[1]
-            balanced = is_parentheses_balanced(paren_str)
-            resp = f"the parentheses are balanced: {'yes' if balanced else 'no'}\n"
-            try:
-                sock.sendall(resp.encode())
-            except Exception:
-                close_client(sock)
+        try:
+            x = int(parts[0])
+            y = int(parts[1])
+        except ValueError:
+            close_client(sock)
             return
+        pending[sock].append(_lcm_resp(x, y))
 
-        # lcm: X Y
-        if line.startswith("lcm:"):
-            parts = line.split()
-            if len(parts) != 3:
-                close_client(sock)
-                return
-            try:
-                x = int(parts[1])
-                y = int(parts[2])
-            except ValueError:
-                close_client(sock)
-                return
-            result = lcm(x, y)
-            resp = f"the lcm is: {result}\n"
-            try:
-                sock.sendall(resp.encode())
-            except Exception:
-                close_client(sock)
+    def handle_caesar(sock, arg):
+        # One rpartition splits off the trailing shift token
+        plaintext, sep, shift_str = arg.strip().rpartition(" ")
+        if not sep or not plaintext:
+            close_client(sock)
+            return
+        try:
+            shift = int(shift_str)
+        except ValueError:
+            close_client(sock)
             return
 
-        # caesar: plaintext X
-        if line.startswith("caesar:"):
-            after_prefix = line[len("caesar:"):].strip()
-            if " " not in after_prefix:
-                close_client(sock)
-                return
-            plaintext, shift_str = after_prefix.rsplit(" ", 1)
-            if not plaintext:
-                close_client(sock)
-                return
-            try:
-                shift = int(shift_str)
-            except ValueError:
-                close_client(sock)
-                return
+        pending[sock].append(_caesar_resp(plaintext, shift))
 
-            ciphertext = caesar_cipher(plaintext, shift)
-            if ciphertext is None:
-                resp = "error: invalid input\n"
-            else:
-                resp = f"the ciphertext is: {ciphertext}\n"
+    # Command name -> handler; each handler gets the already-isolated argument
+    handlers = {
+        "parentheses": handle_parentheses,
+        "lcm": handle_lcm,
+        "caesar": handle_caesar,
+    }
 
-            try:
-                sock.sendall(resp.encode())
-            except Exception:
-                close_client(sock)
+    def handle_command_line(sock, line, state):
+        """
+        Handle a single command line for a logged-in client.
+        """
+        head, sep, rest = line.partition(":")
+        handler = handlers.get(head) if sep else None
+        if handler is None:
+            # 'quit' and unknown commands both close the connection
+            # with no response, so one partition covers every case
+            close_client(sock)
             return
-
-        # Any other command -> protocol error -> close
-        close_client(sock)
+        handler(sock, rest)
 
     while True:
         try:
-            readable, _, _ = select.select(inputs, [], [])
+            events = sel.select()
         except Exception:
             # Simple HW server, on select error we just continue
             continue
 
-        for s in readable:
+        for key, _ in events:
+            s = key.fileobj
             if s is server_sock:
-                # New connection
-                try:
-                    client_sock, addr = server_sock.accept()
-                except Exception:
-                    continue
-
-                inputs.append(client_sock)
-                buffers[client_sock] = ""
-                client_state[client_sock] = {
-                    "logged_in": False,
-                    "login_stage": "await_user",
-                    "username": None,
-                    "pending_username": None,
-                }
-
-                # Send welcome message exactly once
-                try:
-                    client_sock.sendall(b"Welcome! Please log in\n")
-                except Exception:
-                    close_client(client_sock)
+                # New connections: accept everything pending on this wake-up
+                while True:
+                    try:
+                        client_sock, addr = server_sock.accept()
+                    except BlockingIOError:
+                        break
+                    except Exception:
+                        break
+
+                    tune_socket(client_sock)
+                    sel.register(client_sock, selectors.EVENT_READ)
+                    buffers[client_sock] = bytearray()
+                    pending[client_sock] = []
+                    client_state[client_sock] = {
+                        "logged_in": False,
+                        "login_stage": "await_user",
+                        "username": None,
+                        "pending_username": None,
+                    }
+
+                    # Send welcome message exactly once
+                    try:
+                        client_sock.sendall(WELCOME_MSG)
+                    except Exception:
+                        close_client(client_sock)
 
             else:
                 # Data from existing client
                 try:
-                    data = s.recv(RECV_BUF_SIZE)
+                    n = s.recv_into(recv_view)
                 except Exception:
                     close_client(s)
                     continue
 
-                if not data:
+                if n == 0:
                     # Client closed connection
                     close_client(s)
                     continue
 
-                # Append to buffer
-                try:
-                    buffers[s] += data.decode()
-                except UnicodeDecodeError:
-                    close_client(s)
-                    continue
-
-                # Process complete lines
-                while "\n" in buffers[s]:
-                    line, rest = buffers[s].split("\n", 1)
-                    buffers[s] = rest
-                    line = line.rstrip("\r")
+                # Append to buffer; bytes stay undecoded until a full line arrives
+                buf = buffers[s]
+                buf.extend(recv_view[:n])
+
+                # Process complete lines, splicing them out of the buffer in place
+                while True:
+                    i = buf.find(b"\n")
+                    if i < 0:
+                        break
+                    try:
+                        line = buf[:i].rstrip(b"\r").decode("utf-8")
+                    except UnicodeDecodeError:
+                        close_client(s)
+                        break
+                    del buf[:i + 1]
 
                     state = client_state.get(s)
                     if state is None:
@@ -322,13 +436,16 @@ def main():
 
                     if not state["logged_in"]:
                         handle_login_line(s, line, state)
-                        if s not in inputs:
+                        if s not in client_state:
                             break  # client closed
                     else:
                         handle_command_line(s, line, state)
-                        if s not in inputs:
+                        if s not in client_state:
                             break  # client closed
 
+                # One sendall for everything queued by the lines above
+                flush(s)
+
 
 if __name__ == "__main__":
     main()
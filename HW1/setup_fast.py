@@ -0,0 +1,10 @@
+#!/usr/bin/python3
+"""
+Build the optional ex1_fast extension in place:
+    python setup_fast.py build_ext --inplace
+Requires Cython; ex1_server.py works without the extension.
+"""
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(ext_modules=cythonize("ex1_fast.pyx"))